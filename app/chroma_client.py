@@ -2,49 +2,102 @@
 import os
 from typing import List, Dict, Any, Optional
 import chromadb
-from chromadb.config import Settings
 import numpy as np
 
 # ✅ Import unified guardrails
-from app.guardrails import apply_guardrails
+from app.guardrails import apply_guardrails, GUARDRAILS_VERSION
 
 CHROMA_DIR_ENV = "CHROMA_DB_DIR"
+CHROMA_BATCH_SIZE_ENV = "CHROMA_BATCH_SIZE"
+DEFAULT_BATCH_SIZE = 1000
+VERSION_KEY = "guardrails_version"
+
 
 class ChromaClient:
-    def __init__(self, persist_dir: Optional[str] = None):
+    """
+    Persistent Chroma store for sanitized resume text.
+    Documents are redacted once at insert time and stamped with the
+    guardrail config version, so reads only re-sanitize stale entries.
+    """
+
+    def __init__(self, persist_dir: Optional[str] = None, collection_name: str = "resumes",
+                 batch_size: Optional[int] = None):
         persist_dir = persist_dir or os.getenv(CHROMA_DIR_ENV, "./chroma_db")
-        settings = Settings(chroma_db_impl="duckdb+parquet", persist_directory=persist_dir)
-        self.client = chromadb.Client(settings=settings)
-        self.collection = self._get_or_create_collection("resumes")
-
-    def _get_or_create_collection(self, name: str):
-        if name in [c.name for c in self.client.list_collections()]:
-            return self.client.get_collection(name)
-        else:
-            return self.client.create_collection(name)
-
-    def upsert_documents(self, ids: List[str], embeddings: np.ndarray, metadatas: List[Dict[str, Any]], documents: List[str]):
-        # ✅ Apply guardrails to all documents before insertion
-        safe_documents = [apply_guardrails(doc) for doc in documents]
-        embs_list = embeddings.tolist() if isinstance(embeddings, np.ndarray) else embeddings
-        self.collection.add(
-            ids=ids,
-            embeddings=embs_list,
-            metadatas=metadatas,
-            documents=safe_documents
+        self.client = chromadb.PersistentClient(path=persist_dir)
+        self.collection = self.client.get_or_create_collection(
+            collection_name, metadata={"hnsw:space": "l2"}  # match FAISS IndexFlatL2
         )
+        self.batch_size = self._resolve_batch_size(batch_size)
+
+    def _resolve_batch_size(self, batch_size: Optional[int]) -> int:
+        size = batch_size or int(os.getenv(CHROMA_BATCH_SIZE_ENV, DEFAULT_BATCH_SIZE))
+        # Never exceed the server/SQLite limit on a single write
+        get_max = getattr(self.client, "get_max_batch_size", None)
+        server_max = get_max() if callable(get_max) else getattr(self.client, "max_batch_size", None)
+        if server_max:
+            size = min(size, server_max)
+        return max(size, 1)
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    def get_ids(self, where: Dict[str, Any]) -> List[str]:
+        """Ids of all stored documents whose metadata matches `where`."""
+        return self.collection.get(where=where, include=[])["ids"]
+
+    def existing_ids(self, ids: List[str]) -> List[str]:
+        """Subset of `ids` already stored, so callers can skip re-embedding them."""
+        if not ids:
+            return []
+        return self.collection.get(ids=ids, include=[])["ids"]
+
+    def delete_documents(self, ids: List[str]):
+        for start in range(0, len(ids), self.batch_size):
+            self.collection.delete(ids=ids[start:start + self.batch_size])
+
+    def upsert_documents(self, ids: List[str], embeddings: np.ndarray, metadatas: List[Dict[str, Any]],
+                         documents: List[str], sanitized: bool = False):
+        """
+        Idempotently upsert documents in batches.
+        Pass sanitized=True when documents already went through apply_guardrails.
+        """
+        # ✅ Apply guardrails to all documents before insertion (unless already done)
+        safe_documents = documents if sanitized else [apply_guardrails(doc) for doc in documents]
+        embs_list = embeddings.tolist() if isinstance(embeddings, np.ndarray) else embeddings
+        safe_metadatas = [{**(m or {}), VERSION_KEY: GUARDRAILS_VERSION} for m in metadatas]
+
+        for start in range(0, len(ids), self.batch_size):
+            end = start + self.batch_size
+            self.collection.upsert(
+                ids=ids[start:end],
+                embeddings=embs_list[start:end],
+                metadatas=safe_metadatas[start:end],
+                documents=safe_documents[start:end]
+            )
 
-    def query_similar(self, query_embedding: np.ndarray, top_k: int = 5):
-        q_emb = query_embedding.tolist() if isinstance(query_embedding, np.ndarray) else query_embedding
+    def query_similar(self, query_embeddings: np.ndarray, top_k: int = 5,
+                      where: Optional[Dict[str, Any]] = None):
+        """
+        Query one or many embeddings in a single call.
+        Results are lists per query embedding, as returned by Chroma; every
+        returned document is sanitized under the current GUARDRAILS_VERSION.
+        """
+        q_embs = np.atleast_2d(np.asarray(query_embeddings, dtype="float32")).tolist()
+        kwargs = {"where": where} if where else {}  # older 0.4.x rejects where=None
         results = self.collection.query(
-            query_embeddings=[q_emb],
+            query_embeddings=q_embs,
             n_results=top_k,
-            include=["metadatas", "documents", "distances"]
+            include=["metadatas", "documents", "distances"],
+            **kwargs
         )
 
-        # ✅ Apply guardrails to documents in the results
-        for doc_list in results.get("documents", []):
+        # ✅ Re-sanitize only documents stored under an older guardrail config
+        metadata_lists = results.get("metadatas") or []
+        for q, doc_list in enumerate(results.get("documents") or []):
+            metas = metadata_lists[q] if q < len(metadata_lists) else []
             for i in range(len(doc_list)):
-                doc_list[i] = apply_guardrails(doc_list[i])
+                meta = metas[i] if i < len(metas) else None
+                if not meta or meta.get(VERSION_KEY) != GUARDRAILS_VERSION:
+                    doc_list[i] = apply_guardrails(doc_list[i])
 
         return results
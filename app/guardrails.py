@@ -5,6 +5,8 @@ Unified Guardrails System (Updated)
 - Never fully blocks queries, always returns sanitized response
 """
 #guard rail
+import hashlib
+import json
 import logging
 from typing import Dict, Any
 from presidio_analyzer import AnalyzerEngine
@@ -78,6 +80,17 @@ DETECTION_MODES = {
 }
 DEFAULT_DETECTION_MODE = 'moderate'
 
+# Bump whenever the redaction logic itself changes (analyze_text, redact_pii,
+# apply_guardrails), so documents sanitized by older code are re-redacted.
+GUARDRAILS_SCHEMA = 1
+
+# Fingerprint of the active guardrail logic + config; stored alongside sanitized
+# documents so they are only re-redacted when either changes.
+GUARDRAILS_VERSION = hashlib.sha256(
+    json.dumps([GUARDRAILS_SCHEMA, PII_DETECTION_CONFIG, DETECTION_MODES, DEFAULT_DETECTION_MODE],
+               sort_keys=True).encode("utf-8")
+).hexdigest()[:12]
+
 
 # ==========================
 # 🔹 Advanced PII Detector
@@ -1,15 +1,18 @@
 # app/main.py
 import os
+import io
+import hashlib
 import fitz  # PyMuPDF
 import faiss
 import numpy as np
 import pickle
 from sentence_transformers import SentenceTransformer
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Request, request, jsonify, render_template
 from dotenv import load_dotenv
 import google.generativeai as genai
 import sys
 import re
+import threading
 
 # ===== Guardrails (unified) =====
 try:
@@ -22,6 +25,9 @@ except Exception:
 load_dotenv()
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 SBERT_MODEL = os.getenv("SBERT_MODEL", "all-MiniLM-L6-v2")
+RETRIEVAL_BACKEND = os.getenv("RETRIEVAL_BACKEND", "faiss").strip().lower()  # faiss | chroma
+if RETRIEVAL_BACKEND not in ("faiss", "chroma"):
+    raise ValueError(f"❌ Unknown RETRIEVAL_BACKEND: {RETRIEVAL_BACKEND}")
 if not GOOGLE_API_KEY:
     raise ValueError("❌ GOOGLE_API_KEY not found in .env file")
 
@@ -33,9 +39,37 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 RESUME_FOLDER = os.path.join(BASE_DIR, "resumes")
 FAISS_INDEX_FILE = os.path.join(BASE_DIR, "faiss_index.index")
 TEXT_STORE_FILE = os.path.join(BASE_DIR, "resume_texts.pkl")
+UPLOAD_STORE_FILE = os.path.join(BASE_DIR, "uploaded_resumes.pkl")  # append-only log
+
+# ===== Upload limits =====
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 10 * 1024 * 1024))  # per file
+MAX_UPLOAD_PAGES = int(os.getenv("MAX_UPLOAD_PAGES", 20))                 # per file
+MAX_UPLOAD_FILES = int(os.getenv("MAX_UPLOAD_FILES", 50))                 # per request
+MAX_UPLOAD_REQUEST_BYTES = int(os.getenv("MAX_UPLOAD_REQUEST_BYTES", 50 * 1024 * 1024))
+# Concurrent uploads; 429 only triggers under a threaded server (see Dockerfile)
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", 4))
+INGEST_RETRY_AFTER = int(os.getenv("INGEST_RETRY_AFTER", 5))              # seconds
+
+# ===== Live index state =====
+_index_lock = threading.Lock()                         # guards _live and the stores on disk
+_ingest_slots = threading.BoundedSemaphore(INGEST_QUEUE_SIZE)
+# FAISS index + texts kept in memory; "uploads" maps doc id -> (source, text, embedding)
+# and "positions" maps doc id -> row in the index.
+_live = {"loaded": False, "index": None, "texts": [], "uploads": {}, "positions": {}}
+_embedding_model = None
+_chroma_client = None
 
 # ===== Flask app =====
+class InMemoryRequest(Request):
+    """Keep multipart uploads in memory so PDFs are never staged on disk."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return io.BytesIO()
+
+
 app = Flask(__name__, template_folder="templates", static_folder="static")
+app.request_class = InMemoryRequest
+app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_REQUEST_BYTES
 
 
 # ===== Extra Guardrail: Block Academic Scores =====
@@ -70,55 +104,263 @@ def extract_text_from_pdf(pdf_path: str) -> str:
     return apply_guardrails(raw)
 
 
+def iter_sanitized_pages(doc):
+    """Yield sanitized text page by page from an open PyMuPDF document."""
+    for page in doc:
+        page_text = page.get_text().strip()
+        if page_text:
+            yield apply_guardrails(page_text)
+
+
+def extract_text_from_pdf_bytes(data: bytes, filename: str = "upload.pdf") -> str:
+    """Extract and sanitize text from an in-memory PDF without touching disk."""
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        if doc.page_count > MAX_UPLOAD_PAGES:
+            raise ValueError(f"{filename} has {doc.page_count} pages (limit {MAX_UPLOAD_PAGES})")
+        return "\n".join(iter_sanitized_pages(doc)).strip()
+
+
+def get_embedding_model():
+    """Load the SBERT model once per process."""
+    global _embedding_model
+    if _embedding_model is None:
+        _embedding_model = SentenceTransformer(SBERT_MODEL)
+    return _embedding_model
+
+
+def get_chroma_client():
+    """Open the persistent Chroma store once per process (chroma backend only)."""
+    global _chroma_client
+    if _chroma_client is None:
+        try:
+            from app.chroma_client import ChromaClient
+        except Exception:
+            from chroma_client import ChromaClient
+        _chroma_client = ChromaClient()
+    return _chroma_client
+
+
 def create_embeddings(texts):
-    """Generate embeddings for sanitized texts."""
-    model = SentenceTransformer(SBERT_MODEL)
-    safe_texts = [apply_guardrails(t) for t in texts]
-    embeddings = model.encode(safe_texts, convert_to_numpy=True, show_progress_bar=False)
+    """Generate embeddings for texts already sanitized by extract_text_from_pdf."""
+    model = get_embedding_model()
+    embeddings = model.encode(texts, convert_to_numpy=True, show_progress_bar=False)
     return model, np.array(embeddings)
 
 
-def build_faiss_index():
-    """Build FAISS index from resumes with guardrails."""
+def load_resume_folder():
+    """Return (pdf_files, sanitized_texts) from RESUME_FOLDER, or None if empty."""
     if not os.path.exists(RESUME_FOLDER):
         os.makedirs(RESUME_FOLDER)
-        return False
+        return None
 
     pdf_files = [f for f in os.listdir(RESUME_FOLDER) if f.lower().endswith(".pdf")]
     if not pdf_files:
-        return False
+        return None
 
     texts = [extract_text_from_pdf(os.path.join(RESUME_FOLDER, pdf)) for pdf in pdf_files]
-    model, embeddings = create_embeddings(texts)
+    return pdf_files, texts
 
-    dim = embeddings.shape[1]
-    index = faiss.IndexFlatL2(dim)
-    index.add(embeddings)
 
-    faiss.write_index(index, FAISS_INDEX_FILE)
-    with open(TEXT_STORE_FILE, "wb") as f:
-        pickle.dump((texts, model), f)
+def build_index():
+    """Build the configured retrieval backend from the resumes folder."""
+    if RETRIEVAL_BACKEND == "chroma":
+        return build_chroma_index()
+    return build_faiss_index()
 
+
+def build_chroma_index():
+    """
+    Sync resumes folder into Chroma, matching the FAISS rebuild: folder PDFs
+    are upserted, removed ones deleted, uploaded documents left untouched.
+    """
+    loaded = load_resume_folder()
+    if not loaded:
+        return False
+    pdf_files, texts = loaded
+
+    client = get_chroma_client()
+    ids = [f"resumes/{pdf}" for pdf in pdf_files]
+    _, embeddings = create_embeddings(texts)
+    client.upsert_documents(
+        ids=ids,
+        embeddings=embeddings,
+        metadatas=[{"source": pdf, "origin": "folder"} for pdf in pdf_files],
+        documents=texts,
+        sanitized=True
+    )
+
+    stale = set(client.get_ids(where={"origin": "folder"})) - set(ids)
+    if stale:
+        client.delete_documents(sorted(stale))
     return True
 
 
+def build_faiss_index():
+    """Rebuild FAISS from the resumes folder, keeping documents ingested via /upload."""
+    loaded = load_resume_folder()
+    if not loaded:
+        return False
+    _, texts = loaded
+
+    _, embeddings = create_embeddings(texts)
+    embeddings = np.asarray(embeddings, dtype="float32")
+
+    with _index_lock:
+        _ensure_live_index()
+        faiss.write_index(_new_index(embeddings), FAISS_INDEX_FILE)
+        with open(TEXT_STORE_FILE, "wb") as f:
+            pickle.dump(texts, f)
+        # Swap in the folder docs, then re-append uploads (including any that
+        # committed while the folder was being embedded)
+        uploads = list(_live["uploads"].items())
+        _reset_live(_new_index(embeddings), list(texts))
+        _add_uploads(uploads)
+
+    return True
+
+
+def _new_index(embeddings):
+    index = faiss.IndexFlatL2(embeddings.shape[1])
+    index.add(embeddings)
+    return index
+
+
+def _reset_live(index, texts):
+    _live.update({"loaded": True, "index": index, "texts": texts, "uploads": {}, "positions": {}})
+
+
+def _add_uploads(records):
+    """Append (doc_id, (source, text, embedding)) records to the live index. Caller holds _index_lock."""
+    records = [(doc_id, rec) for doc_id, rec in dict(records).items() if doc_id not in _live["positions"]]
+    if not records:
+        return
+    embeddings = np.vstack([rec[2] for _, rec in records]).astype("float32")
+    if _live["index"] is None:
+        _live["index"] = faiss.IndexFlatL2(embeddings.shape[1])
+    start = _live["index"].ntotal
+    _live["index"].add(embeddings)
+    for offset, (doc_id, rec) in enumerate(records):
+        _live["texts"].append(rec[1])
+        _live["uploads"][doc_id] = rec
+        _live["positions"][doc_id] = start + offset
+
+
+def _ensure_live_index():
+    """Load the folder index and replay the upload log once per process. Caller holds _index_lock."""
+    if _live["loaded"]:
+        return
+    index, texts = None, []
+    if os.path.exists(FAISS_INDEX_FILE) and os.path.exists(TEXT_STORE_FILE):
+        index = faiss.read_index(FAISS_INDEX_FILE)
+        with open(TEXT_STORE_FILE, "rb") as f:
+            texts = pickle.load(f)
+        if isinstance(texts, tuple):  # legacy (texts, model) store
+            texts = texts[0]
+    _reset_live(index, list(texts))
+
+    records = []
+    if os.path.exists(UPLOAD_STORE_FILE):
+        with open(UPLOAD_STORE_FILE, "rb") as f:
+            while True:
+                try:
+                    records.append(pickle.load(f))
+                except EOFError:
+                    break
+    _add_uploads(records)
+
+
+def append_to_index(new_texts, ids, sources):
+    """
+    Embed already-sanitized texts and append them to the live index.
+    Ids are unique content hashes; re-uploading a known document is a no-op.
+    Returns the ids, which stay stable across rebuilds on both backends.
+    """
+    if RETRIEVAL_BACKEND == "chroma":
+        known = set(get_chroma_client().existing_ids(ids))
+    else:
+        with _index_lock:
+            _ensure_live_index()
+            known = set(_live["positions"])
+    pending = [i for i, doc_id in enumerate(ids) if doc_id not in known]
+
+    model = get_embedding_model()
+    embeddings = np.asarray(
+        model.encode([new_texts[i] for i in pending], convert_to_numpy=True, show_progress_bar=False),
+        dtype="float32",
+    ) if pending else np.zeros((0, 0), dtype="float32")
+
+    if RETRIEVAL_BACKEND == "chroma":
+        # Upsert by content hash: a concurrent re-send overwrites, not duplicates
+        if pending:
+            get_chroma_client().upsert_documents(
+                ids=[ids[i] for i in pending],
+                embeddings=embeddings,
+                metadatas=[{"source": sources[i], "origin": "upload"} for i in pending],
+                documents=[new_texts[i] for i in pending],
+                sanitized=True
+            )
+        return ids
+
+    records = [(ids[i], (sources[i], new_texts[i], embeddings[row])) for row, i in enumerate(pending)]
+    with _index_lock:
+        _ensure_live_index()
+        records = [r for r in records if r[0] not in _live["positions"]]
+        # Persist only the new records: O(upload), not O(corpus)
+        if records:
+            with open(UPLOAD_STORE_FILE, "ab") as f:
+                for record in records:
+                    pickle.dump(record, f)
+        _add_uploads(records)
+    return ids
+
+
 def search_resumes(query: str):
-    """Vector search sanitized corpus."""
-    if not (os.path.exists(FAISS_INDEX_FILE) and os.path.exists(TEXT_STORE_FILE)):
-        return None
+    """
+    Vector search sanitized corpus.
+    Returns (text, already_sanitized) or None; already_sanitized means the text
+    is redacted under the current guardrail version and needs no NER pass.
+    """
+    if RETRIEVAL_BACKEND == "chroma":
+        return search_chroma(query)
+    return search_faiss(query)
+
 
-    index = faiss.read_index(FAISS_INDEX_FILE)
-    with open(TEXT_STORE_FILE, "rb") as f:
-        texts, model = pickle.load(f)
+def search_chroma(query: str):
+    client = get_chroma_client()
+    if client.count() == 0:
+        return None
 
     safe_query = apply_guardrails(query)
-    query_vector = model.encode([safe_query], convert_to_numpy=True, show_progress_bar=False)
-    distances, indices = index.search(query_vector, k=1)
+    query_vector = get_embedding_model().encode([safe_query], convert_to_numpy=True, show_progress_bar=False)
+    results = client.query_similar(query_vector, top_k=1)
 
-    if len(indices) == 0 or indices[0][0] == -1:
+    documents = results.get("documents") or []
+    if not documents or not documents[0]:
         return None
 
-    return texts[indices[0][0]]  # Already sanitized
+    # Sanitized at rest, or re-redacted by query_similar if the version is stale
+    return documents[0][0], True
+
+
+def search_faiss(query: str):
+    safe_query = apply_guardrails(query)
+    query_vector = np.asarray(
+        get_embedding_model().encode([safe_query], convert_to_numpy=True, show_progress_bar=False),
+        dtype="float32",
+    )
+
+    with _index_lock:
+        _ensure_live_index()
+        index, texts = _live["index"], _live["texts"]
+        if index is None or index.ntotal == 0:
+            return None
+        distances, indices = index.search(query_vector, k=1)
+
+        if len(indices) == 0 or indices[0][0] == -1:
+            return None
+
+        # Sanitized at insert, but not version-stamped: re-check on read
+        return texts[indices[0][0]], False
 
 
 # ===== Routes =====
@@ -129,11 +371,95 @@ def home():
 
 @app.route("/build_index", methods=["GET"])
 def build_index_route():
-    if build_faiss_index():
-        return jsonify({"message": "✅ Resume index built successfully"}), 200
+    if build_index():
+        return jsonify({"message": f"✅ Resume index built successfully ({RETRIEVAL_BACKEND})"}), 200
     return jsonify({"error": "❌ No PDFs found in resumes/ folder"}), 400
 
 
+@app.route("/upload", methods=["POST"])
+def upload_resumes():
+    """Ingest one or more PDFs (multipart field `file` or `files`) into the live index."""
+    if request.content_length is not None and request.content_length > MAX_UPLOAD_REQUEST_BYTES:
+        return jsonify({"error": f"Request exceeds {MAX_UPLOAD_REQUEST_BYTES} bytes"}), 413
+
+    # ✅ Backpressure: reject before the body is read, instead of queueing unbounded work
+    if not _ingest_slots.acquire(blocking=False):
+        response = jsonify({"error": "Ingest queue is full, retry later"})
+        response.headers["Retry-After"] = str(INGEST_RETRY_AFTER)
+        return response, 429
+
+    try:
+        uploads = request.files.getlist("files") + request.files.getlist("file")
+        if not uploads:
+            return jsonify({"error": "No files uploaded (use multipart field 'file' or 'files')"}), 400
+        if len(uploads) > MAX_UPLOAD_FILES:
+            return jsonify({"error": f"Too many files: {len(uploads)} (limit {MAX_UPLOAD_FILES})"}), 413
+
+        results, texts, indexed, ids = [], [], [], []
+        seen, repeats = {}, []
+        for upload in uploads:
+            name = upload.filename or "upload.pdf"
+            if not name.lower().endswith(".pdf"):
+                results.append({"file": name, "status": "rejected", "error": "Not a PDF"})
+                continue
+
+            data = upload.stream.read(MAX_UPLOAD_BYTES + 1)
+            if len(data) > MAX_UPLOAD_BYTES:
+                results.append({"file": name, "status": "rejected",
+                                "error": f"File exceeds {MAX_UPLOAD_BYTES} bytes"})
+                continue
+
+            # Same bytes twice in one request: process once, mirror the outcome
+            doc_id = "upload/" + hashlib.sha256(data).hexdigest()
+            entry = {"file": name}
+            results.append(entry)
+            if doc_id in seen:
+                repeats.append((entry, seen[doc_id]))
+                continue
+            seen[doc_id] = entry
+
+            try:
+                text = extract_text_from_pdf_bytes(data, name)
+            except ValueError as e:
+                entry.update({"status": "rejected", "error": str(e)})
+                continue
+            except Exception as e:
+                entry.update({"status": "rejected", "error": f"Could not read PDF: {e}"})
+                continue
+
+            if not text:
+                entry.update({"status": "rejected", "error": "No extractable text"})
+                continue
+
+            entry.update({"status": "indexed", "doc_id": doc_id})
+            indexed.append(entry)
+            texts.append(text)
+            ids.append(doc_id)
+
+        if texts:
+            try:
+                append_to_index(texts, ids, [e["file"] for e in indexed])
+            except Exception as e:
+                for entry in indexed:
+                    entry.pop("doc_id")
+                    entry.update({"status": "error", "error": f"Indexing failed: {e}"})
+        for entry, first in repeats:
+            entry.update({k: v for k, v in first.items() if k != "file"})
+    finally:
+        _ingest_slots.release()
+
+    ok = sum(r["status"] == "indexed" for r in results)
+    if ok == len(results):
+        status = 200
+    elif ok:
+        status = 207
+    elif any(r["status"] == "error" for r in results):
+        status = 500  # server-side indexing failure
+    else:
+        status = 400  # every file rejected by validation
+    return jsonify({"indexed": ok, "total": len(results), "files": results}), status
+
+
 @app.route("/query", methods=["POST"])
 def query_resume():
     data = request.get_json() or {}
@@ -141,12 +467,13 @@ def query_resume():
     if not query:
         return jsonify({"error": "Query is required"}), 400
 
-    matched_text = search_resumes(query)
-    if not matched_text:
+    match = search_resumes(query)
+    if not match or not match[0]:
         return jsonify({"error": "No relevant resume data found for your query."}), 404
+    matched_text, already_sanitized = match
 
-    # ✅ Redact sensitive data but keep names & resume info
-    redacted_text = apply_guardrails(matched_text)
+    # ✅ Redact sensitive data but keep names & resume info (skip if current at rest)
+    redacted_text = matched_text if already_sanitized else apply_guardrails(matched_text)
     redacted_text = block_academic_scores(redacted_text)  # 🚨 block CGPA/GPA/marks
 
     # ✅ Guardrails check (soft enforcement: redact, don’t block unless high risk)
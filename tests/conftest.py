@@ -0,0 +1,74 @@
+# tests/conftest.py
+import os
+import sys
+import types
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+os.environ["RETRIEVAL_BACKEND"] = "faiss"
+
+EMBED_DIM = 64
+
+
+class FakeSentenceTransformer:
+    """Deterministic bag-of-words embedder standing in for SBERT."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def encode(self, texts, **kwargs):
+        vectors = np.zeros((len(texts), EMBED_DIM), dtype="float32")
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, sum(map(ord, word)) % EMBED_DIM] += 1.0
+        return vectors
+
+
+def _install_stubs():
+    """Replace the heavy model-backed modules before app.main is imported."""
+    st = types.ModuleType("sentence_transformers")
+    st.SentenceTransformer = FakeSentenceTransformer
+    sys.modules["sentence_transformers"] = st
+
+    guardrails = types.ModuleType("app.guardrails")
+    guardrails.apply_guardrails = lambda text, mode=None: text
+    guardrails.advanced_guardrails = types.SimpleNamespace(
+        analyze_content=lambda text: {"safe": True, "metadata": {}, "risk_score": 0.0}
+    )
+    guardrails.GUARDRAILS_VERSION = "test"
+    sys.modules["app.guardrails"] = guardrails
+
+    genai = types.ModuleType("google.generativeai")
+    genai.configure = lambda **kwargs: None
+    genai.GenerativeModel = lambda name: types.SimpleNamespace(
+        generate_content=lambda prompt: types.SimpleNamespace(text="stub answer")
+    )
+    google = sys.modules.setdefault("google", types.ModuleType("google"))
+    google.generativeai = genai
+    sys.modules["google.generativeai"] = genai
+
+
+_install_stubs()
+
+
+@pytest.fixture
+def main(tmp_path, monkeypatch):
+    """app.main with all on-disk stores redirected to tmp_path and a fresh live index."""
+    from app import main as main_module
+
+    monkeypatch.setattr(main_module, "RESUME_FOLDER", str(tmp_path / "resumes"))
+    monkeypatch.setattr(main_module, "FAISS_INDEX_FILE", str(tmp_path / "faiss_index.index"))
+    monkeypatch.setattr(main_module, "TEXT_STORE_FILE", str(tmp_path / "resume_texts.pkl"))
+    monkeypatch.setattr(main_module, "UPLOAD_STORE_FILE", str(tmp_path / "uploaded_resumes.pkl"))
+    monkeypatch.setattr(main_module, "_live", {"loaded": False, "index": None, "texts": [],
+                                               "uploads": {}, "positions": {}})
+    return main_module
+
+
+@pytest.fixture
+def client(main):
+    return main.app.test_client()
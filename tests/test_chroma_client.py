@@ -0,0 +1,135 @@
+# tests/test_chroma_client.py
+import math
+import sys
+import types
+
+import numpy as np
+import pytest
+
+sys.modules.setdefault("chromadb", types.ModuleType("chromadb"))  # real client not needed
+
+from app import chroma_client  # noqa: E402
+from app.chroma_client import ChromaClient, VERSION_KEY  # noqa: E402
+
+
+class FakeCollection:
+    def __init__(self):
+        self.upserts = []
+        self.query_result = None
+
+    def upsert(self, ids, embeddings, metadatas, documents):
+        self.upserts.append({"ids": ids, "metadatas": metadatas, "documents": documents})
+
+    def query(self, **kwargs):
+        self.query_kwargs = kwargs
+        return self.query_result
+
+
+class FakePersistentClient:
+    max_batch = None
+
+    def __init__(self, path):
+        self.collection = FakeCollection()
+
+    def get_or_create_collection(self, name, metadata=None):
+        return self.collection
+
+    def get_max_batch_size(self):
+        return self.max_batch
+
+
+@pytest.fixture
+def make_client(monkeypatch):
+    def factory(batch_size=None, server_max=None):
+        monkeypatch.setattr(FakePersistentClient, "max_batch", server_max)
+        monkeypatch.setattr(chroma_client.chromadb, "PersistentClient", FakePersistentClient, raising=False)
+        return ChromaClient(persist_dir="unused", batch_size=batch_size)
+    return factory
+
+
+@pytest.fixture
+def guardrail_calls(monkeypatch):
+    calls = []
+
+    def spy(text, mode=None):
+        calls.append(text)
+        return f"[SANITIZED] {text}"
+    monkeypatch.setattr(chroma_client, "apply_guardrails", spy)
+    return calls
+
+
+def upsert(client, n):
+    client.upsert_documents(
+        ids=[f"doc-{i}" for i in range(n)],
+        embeddings=np.zeros((n, 4), dtype="float32"),
+        metadatas=[{"source": f"doc-{i}.pdf"} for i in range(n)],
+        documents=[f"text {i}" for i in range(n)],
+        sanitized=True,
+    )
+
+
+@pytest.mark.parametrize("n, batch_size", [(10, 3), (9, 3), (1, 5), (0, 5)])
+def test_upsert_splits_into_batches(make_client, n, batch_size):
+    client = make_client(batch_size=batch_size)
+
+    upsert(client, n)
+
+    upserts = client.collection.upserts
+    assert len(upserts) == math.ceil(n / batch_size)
+    assert [i for call in upserts for i in call["ids"]] == [f"doc-{i}" for i in range(n)]
+    assert all(len(call["ids"]) <= batch_size for call in upserts)
+
+
+def test_batch_size_capped_by_client_max(make_client):
+    client = make_client(batch_size=1000, server_max=4)
+
+    upsert(client, 10)
+
+    assert client.batch_size == 4
+    assert len(client.collection.upserts) == 3
+
+
+def test_upsert_stamps_guardrails_version(make_client):
+    client = make_client()
+
+    upsert(client, 2)
+
+    metas = client.collection.upserts[0]["metadatas"]
+    assert [m[VERSION_KEY] for m in metas] == [chroma_client.GUARDRAILS_VERSION] * 2
+    assert metas[0]["source"] == "doc-0.pdf"
+
+
+def test_upsert_sanitizes_unless_told_otherwise(make_client, guardrail_calls):
+    client = make_client()
+
+    client.upsert_documents(["a"], np.zeros((1, 4)), [{}], ["raw text"])
+
+    assert guardrail_calls == ["raw text"]
+    assert client.collection.upserts[0]["documents"] == ["[SANITIZED] raw text"]
+
+
+def test_query_resanitizes_only_stale_documents(make_client, guardrail_calls):
+    client = make_client()
+    current = {VERSION_KEY: chroma_client.GUARDRAILS_VERSION}
+    client.collection.query_result = {
+        "documents": [["current", "stale"], ["missing", "no-metadata"]],
+        "metadatas": [[current, {VERSION_KEY: "old"}], [{"source": "x.pdf"}, None]],
+    }
+
+    results = client.query_similar(np.zeros((2, 4)), top_k=2)
+
+    assert guardrail_calls == ["stale", "missing", "no-metadata"]
+    assert results["documents"] == [
+        ["current", "[SANITIZED] stale"],
+        ["[SANITIZED] missing", "[SANITIZED] no-metadata"],
+    ]
+
+
+def test_query_sends_all_embeddings_in_one_call_without_empty_where(make_client):
+    client = make_client()
+    client.collection.query_result = {"documents": [], "metadatas": []}
+
+    client.query_similar(np.zeros((3, 4)))
+
+    assert len(client.collection.query_kwargs["query_embeddings"]) == 3
+    assert "where" not in client.collection.query_kwargs
@@ -0,0 +1,121 @@
+# tests/test_retrieval.py
+import io
+
+import fitz  # PyMuPDF
+
+
+class FakeChromaClient:
+    """In-memory stand-in exposing the ChromaClient methods main.py relies on."""
+
+    def __init__(self):
+        self.docs = {}  # id -> (document, metadata)
+
+    def count(self):
+        return len(self.docs)
+
+    def upsert_documents(self, ids, embeddings, metadatas, documents, sanitized=False):
+        if len(set(ids)) != len(ids):
+            raise ValueError("Chroma rejects duplicate ids in one upsert")
+        for doc_id, meta, doc in zip(ids, metadatas, documents):
+            self.docs[doc_id] = (doc, meta)
+
+    def existing_ids(self, ids):
+        return [i for i in ids if i in self.docs]
+
+    def get_ids(self, where):
+        return [i for i, (_, meta) in self.docs.items()
+                if all(meta.get(k) == v for k, v in where.items())]
+
+    def delete_documents(self, ids):
+        for doc_id in ids:
+            self.docs.pop(doc_id)
+
+    def query_similar(self, query_embeddings, top_k=5, where=None):
+        docs = [doc for doc, _ in self.docs.values()][:top_k]
+        return {"documents": [docs], "metadatas": [[{}] * len(docs)]}
+
+
+def use_chroma(main, monkeypatch):
+    fake = FakeChromaClient()
+    monkeypatch.setattr(main, "RETRIEVAL_BACKEND", "chroma")
+    monkeypatch.setattr(main, "get_chroma_client", lambda: fake)
+    return fake
+
+
+def track_guardrails(main, monkeypatch):
+    calls = []
+
+    def spy(text, mode=None):
+        calls.append(text)
+        return text
+    monkeypatch.setattr(main, "apply_guardrails", spy)
+    return calls
+
+
+def test_chroma_query_skips_resanitizing_current_documents(client, main, monkeypatch):
+    fake = use_chroma(main, monkeypatch)
+    fake.docs["resumes/a.pdf"] = ("Rust systems engineer", {"origin": "folder"})
+    calls = track_guardrails(main, monkeypatch)
+
+    resp = client.post("/query", json={"query": "who knows rust"})
+
+    assert resp.status_code == 200
+    assert "Rust systems engineer" not in calls
+
+
+def test_faiss_query_still_sanitizes_results(client, main, monkeypatch):
+    monkeypatch.setattr(main, "search_resumes", lambda query: ("Rust systems engineer", False))
+    calls = track_guardrails(main, monkeypatch)
+
+    client.post("/query", json={"query": "who knows rust"})
+
+    assert "Rust systems engineer" in calls
+
+
+def test_build_does_not_resanitize_extracted_text(main, monkeypatch):
+    calls = track_guardrails(main, monkeypatch)
+
+    main.create_embeddings(["already sanitized"])
+
+    assert calls == []
+
+
+def test_chroma_build_removes_deleted_folder_pdfs(main, monkeypatch):
+    fake = use_chroma(main, monkeypatch)
+    fake.docs["resumes/gone.pdf"] = ("old", {"origin": "folder"})
+    fake.docs["upload/abc"] = ("pushed", {"origin": "upload"})
+    monkeypatch.setattr(main, "load_resume_folder", lambda: (["kept.pdf"], ["kept text"]))
+
+    assert main.build_chroma_index()
+
+    assert sorted(fake.docs) == ["resumes/kept.pdf", "upload/abc"]
+
+
+def test_chroma_upload_with_repeated_pdf_succeeds(client, main, monkeypatch):
+    fake = use_chroma(main, monkeypatch)
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "Python developer")
+    pdf = doc.tobytes()
+
+    resp = client.post("/upload", content_type="multipart/form-data",
+                       data={"files": [(io.BytesIO(pdf), "a.pdf"), (io.BytesIO(pdf), "b.pdf")]})
+
+    assert resp.status_code == 200
+    assert fake.count() == 1
+
+
+def test_chroma_upload_skips_embedding_known_documents(client, main, monkeypatch):
+    fake = use_chroma(main, monkeypatch)
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "Python developer")
+    pdf = doc.tobytes()
+    client.post("/upload", content_type="multipart/form-data", data={"file": (io.BytesIO(pdf), "a.pdf")})
+
+    encoded = []
+    model = main.get_embedding_model()
+    monkeypatch.setattr(model, "encode", lambda texts, **kw: encoded.append(texts))
+    resp = client.post("/upload", content_type="multipart/form-data", data={"file": (io.BytesIO(pdf), "a.pdf")})
+
+    assert resp.status_code == 200
+    assert encoded == []
+    assert fake.count() == 1
@@ -0,0 +1,166 @@
+# tests/test_upload.py
+import hashlib
+import io
+import os
+import threading
+
+import fitz  # PyMuPDF
+
+
+def make_pdf(*pages: str) -> bytes:
+    doc = fitz.open()
+    for text in pages:
+        doc.new_page().insert_text((72, 72), text)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def doc_id(content: bytes) -> str:
+    return "upload/" + hashlib.sha256(content).hexdigest()
+
+
+def upload(client, *files, field="files"):
+    data = {field: [(io.BytesIO(content), name) for name, content in files]}
+    return client.post("/upload", data=data, content_type="multipart/form-data")
+
+
+def test_single_upload_is_indexed(client):
+    pdf = make_pdf("Python developer with Django")
+    resp = upload(client, ("alice.pdf", pdf), field="file")
+
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert body["indexed"] == 1
+    assert body["files"] == [{"file": "alice.pdf", "status": "indexed", "doc_id": doc_id(pdf)}]
+
+
+def test_bulk_upload_reports_per_file_status(client):
+    resp = upload(
+        client,
+        ("alice.pdf", make_pdf("Python developer")),
+        ("bob.pdf", make_pdf("Rust systems engineer")),
+        ("notes.txt", b"plain text"),
+    )
+
+    assert resp.status_code == 207
+    statuses = {f["file"]: f["status"] for f in resp.get_json()["files"]}
+    assert statuses == {"alice.pdf": "indexed", "bob.pdf": "indexed", "notes.txt": "rejected"}
+
+
+def test_rejects_non_pdf(client):
+    resp = upload(client, ("resume.docx", b"not a pdf"))
+
+    assert resp.status_code == 400
+    assert resp.get_json()["files"][0]["error"] == "Not a PDF"
+
+
+def test_rejects_oversize_file(client, main, monkeypatch):
+    monkeypatch.setattr(main, "MAX_UPLOAD_BYTES", 100)
+
+    resp = upload(client, ("big.pdf", make_pdf("Python developer")))
+
+    assert resp.status_code == 400
+    assert "exceeds" in resp.get_json()["files"][0]["error"]
+
+
+def test_rejects_too_many_pages(client, main, monkeypatch):
+    monkeypatch.setattr(main, "MAX_UPLOAD_PAGES", 2)
+
+    resp = upload(client, ("long.pdf", make_pdf("one", "two", "three")))
+
+    assert resp.status_code == 400
+    assert "3 pages" in resp.get_json()["files"][0]["error"]
+
+
+def test_full_ingest_queue_returns_429(client, main, monkeypatch):
+    monkeypatch.setattr(main, "_ingest_slots", threading.BoundedSemaphore(1))
+    main._ingest_slots.acquire()
+
+    resp = upload(client, ("alice.pdf", make_pdf("Python developer")))
+
+    assert resp.status_code == 429
+    assert resp.headers["Retry-After"] == str(main.INGEST_RETRY_AFTER)
+
+
+def test_indexing_failure_returns_500(client, main, monkeypatch):
+    def boom(*args, **kwargs):
+        raise RuntimeError("disk full")
+    monkeypatch.setattr(main, "append_to_index", boom)
+
+    resp = upload(client, ("alice.pdf", make_pdf("Python developer")))
+
+    assert resp.status_code == 500
+    assert resp.get_json()["files"][0]["status"] == "error"
+
+
+def test_uploaded_document_is_searchable(client, main):
+    upload(client, ("alice.pdf", make_pdf("Python developer with Django")))
+    upload(client, ("bob.pdf", make_pdf("Rust systems engineer embedded firmware")))
+
+    assert "Rust systems engineer" in main.search_resumes("rust firmware engineer")[0]
+
+
+def test_reupload_is_deduplicated(client, main):
+    pdf = make_pdf("Python developer")
+    first = upload(client, ("alice.pdf", pdf)).get_json()["files"][0]
+    second = upload(client, ("alice-copy.pdf", pdf)).get_json()["files"][0]
+
+    assert first["doc_id"] == second["doc_id"]
+    assert main._live["index"].ntotal == 1
+
+
+def test_duplicate_in_one_request_is_indexed_once(client, main):
+    pdf = make_pdf("Python developer")
+
+    resp = upload(client, ("alice.pdf", pdf), ("alice-copy.pdf", pdf))
+
+    assert resp.status_code == 200
+    assert [f["doc_id"] for f in resp.get_json()["files"]] == [doc_id(pdf)] * 2
+    assert main._live["index"].ntotal == 1
+
+    main._live.update({"loaded": False, "index": None, "texts": [], "uploads": {}, "positions": {}})
+    main.search_resumes("python")
+    assert main._live["index"].ntotal == 1
+
+
+def test_doc_id_is_stable_across_rebuild(client, main):
+    pdf = make_pdf("Rust systems engineer")
+    first = upload(client, ("bob.pdf", pdf)).get_json()["files"][0]
+    os.makedirs(main.RESUME_FOLDER)
+    for name in ("a.pdf", "b.pdf"):
+        with open(os.path.join(main.RESUME_FOLDER, name), "wb") as f:
+            f.write(make_pdf(f"Folder resume {name}"))
+    client.get("/build_index")
+
+    second = upload(client, ("bob.pdf", pdf)).get_json()["files"][0]
+
+    assert first["doc_id"] == second["doc_id"] == doc_id(pdf)
+
+
+def test_rebuild_keeps_uploaded_documents(client, main):
+    os.makedirs(main.RESUME_FOLDER)
+    with open(os.path.join(main.RESUME_FOLDER, "folder.pdf"), "wb") as f:
+        f.write(make_pdf("Java backend developer"))
+    upload(client, ("bob.pdf", make_pdf("Rust systems engineer embedded firmware")))
+
+    assert client.get("/build_index").status_code == 200
+
+    assert main._live["index"].ntotal == 2
+    assert "Rust systems engineer" in main.search_resumes("rust firmware engineer")[0]
+
+
+def test_uploads_survive_restart(client, main):
+    upload(client, ("bob.pdf", make_pdf("Rust systems engineer embedded firmware")))
+    main._live.update({"loaded": False, "index": None, "texts": [], "uploads": {}, "positions": {}})
+
+    assert "Rust systems engineer" in main.search_resumes("rust firmware engineer")[0]
+
+
+def test_uploads_are_not_staged_on_disk(main):
+    with main.app.test_request_context(
+        "/upload", method="POST", content_type="multipart/form-data",
+        data={"file": (io.BytesIO(b"%PDF" + b"x" * 1024 * 1024), "big.pdf")},
+    ):
+        from flask import request
+        assert isinstance(request.files["file"].stream, io.BytesIO)